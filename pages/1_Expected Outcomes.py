@@ -1,5 +1,8 @@
+import io
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pac
 import numpy as np
 import plotly.graph_objects as go
 import matplotlib
@@ -24,56 +27,60 @@ st.title("📌 Expected Outcomes – Buy Property vs Rent+EPF (Fair Comparison)"
 # 2. Helper Functions
 # --------------------------
 def calculate_monthly_mortgage(P, annual_rate, years):
-    r = annual_rate / 12
+    r = np.asarray(annual_rate) / 12
     n = years * 12
-    return P * (r * (1 + r)**n) / ((1 + r)**n - 1) if r > 0 else P / n
-
+    f = (1 + r)**n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(r > 0, P * r * f / (f - 1), P / n)
+
+def _project_core(P, loan_amount, mortgage_rate, mortgage_term,
+                  property_growth, epf_rate, rent_yield, years,
+                  down_payment=0, custom_rent=None):
+    # Numeric core shared verbatim by Expected Outcomes and Modelling: yearly series as NumPy arrays.
+    # Rates may carry leading axes, e.g. shape (k, 1), to project k scenarios at once.
+    annual_PMT = calculate_monthly_mortgage(loan_amount, mortgage_rate, mortgage_term) * 12
+    t = np.arange(0, years + 1)
+
+    # Closed forms of the yearly recurrences (no Python loop over years)
+    property_values = P * (1 + property_growth)**t
+
+    # B_t = B_{t-1}*(1 + rate) - annual_PMT, floored at zero once the loan is repaid
+    rate_growth = (1 + mortgage_rate)**t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mortgage_balances = np.where(mortgage_rate > 0,
+                                     loan_amount*rate_growth - annual_PMT*(rate_growth - 1)/mortgage_rate,
+                                     loan_amount - annual_PMT*t)
+    mortgage_balances = np.maximum(mortgage_balances, 0)
+
+    buy_wealth = property_values - mortgage_balances
+    buy_wealth[..., 0] = down_payment  # Year 0
+
+    rents = np.full_like(property_values, float(custom_rent)) if custom_rent is not None else property_values * rent_yield
+    cum_rent = np.cumsum(rents, axis=-1)
+
+    # Leftover goes to EPF with monthly compounding:
+    # w_t = w_{t-1}*g + investable_t  =>  w_t = g**t * sum_k(investable_k / g**k)
+    investable = np.maximum(0, annual_PMT - rents)
+    investable[..., 0] = down_payment  # Year 0
+    epf_compounding = ((1 + epf_rate/12)**12)**t
+    epf_wealth = epf_compounding * np.cumsum(investable / epf_compounding, axis=-1)
+
+    return t, property_values, mortgage_balances, buy_wealth, epf_wealth, rents, cum_rent
+
+@st.cache_data(show_spinner=False, max_entries=128)
 def project_outcomes(P, loan_amount, annual_mortgage_rate, loan_years, property_growth,
                      epf_rate, rent_yield, years, down_payment, custom_rent=None):
-    monthly_PMT = calculate_monthly_mortgage(loan_amount, annual_mortgage_rate, loan_years)
-    property_values = [P]
-    mortgage_balances = [loan_amount]
-    buy_wealth = [down_payment]  # Year 0
-    epf_wealth = [down_payment]  # Year 0
-    rents = []
-    cum_rent = []
-
-    # Initial rent
-    annual_rent = custom_rent if custom_rent is not None else P * rent_yield
-    rents.append(annual_rent)
-    cum_rent.append(annual_rent)
-
-    for t in range(1, years + 1):
-        # Property growth
-        new_property_value = property_values[-1] * (1 + property_growth)
-        property_values.append(new_property_value)
-
-        # Mortgage (annualized)
-        interest_payment = mortgage_balances[-1] * annual_mortgage_rate
-        principal_payment = monthly_PMT*12 - interest_payment
-        new_mortgage_balance = max(0, mortgage_balances[-1] - principal_payment)
-        mortgage_balances.append(new_mortgage_balance)
-
-        # Buy wealth
-        new_buy_wealth = new_property_value - new_mortgage_balance
-        buy_wealth.append(new_buy_wealth)
-
-        # Rent
-        annual_rent = custom_rent if custom_rent is not None else new_property_value * rent_yield
-        rents.append(annual_rent)
-        cum_rent.append(cum_rent[-1] + annual_rent)
-
-        # EPF wealth: leftover goes to EPF with monthly compounding
-        investable = max(0, monthly_PMT*12 - annual_rent)
-        new_epf_wealth = epf_wealth[-1]*(1 + epf_rate/12)**12 + investable
-        epf_wealth.append(new_epf_wealth)
+    t, property_values, mortgage_balances, buy_wealth, epf_wealth, rents, cum_rent = _project_core(
+        P, loan_amount, annual_mortgage_rate, loan_years, property_growth,
+        epf_rate, rent_yield, years, down_payment, custom_rent)
 
     # CAGR calculation
-    buy_cagr = [( (buy_wealth[i]/buy_wealth[0])**(1/i) - 1 if i>0 else 0) for i in range(len(buy_wealth))]
-    epf_cagr = [( (epf_wealth[i]/epf_wealth[0])**(1/i) - 1 if i>0 else 0) for i in range(len(epf_wealth))]
+    cagr_exponent = 1 / np.maximum(t, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        buy_cagr = np.where(t > 0, (buy_wealth/buy_wealth[0])**cagr_exponent - 1, 0.0)
+        epf_cagr = np.where(t > 0, (epf_wealth/epf_wealth[0])**cagr_exponent - 1, 0.0)
 
-    return pd.DataFrame({
-        "Year": np.arange(0, years + 1),
+    df = pd.DataFrame({
         "Property Value": property_values,
         "Mortgage Balance": mortgage_balances,
         "Buy Wealth (RM)": buy_wealth,
@@ -82,7 +89,15 @@ def project_outcomes(P, loan_amount, annual_mortgage_rate, loan_years, property_
         "Cumulative Rent": cum_rent,
         "Buy CAGR": buy_cagr,
         "EPF CAGR": epf_cagr
-    })
+    }, dtype=np.float32)
+    df.insert(0, "Year", t.astype(np.int16))
+    return df
+
+@st.cache_data(show_spinner=False)
+def to_csv_bytes(df):
+    buf = io.BytesIO()
+    pac.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+    return buf.getvalue()
 
 # --------------------------
 # 3. Sidebar Inputs with Sensitivity Sliders
@@ -152,8 +167,9 @@ df = project_outcomes(
     custom_rent=custom_rent
 )
 
-# Break-even
-break_even_year = next((row.Year for i,row in df.iterrows() if row["Buy Wealth (RM)"]>row["EPF Wealth (RM)"]), None)
+# First year in which buying is ahead
+buy_ahead = df["Buy Wealth (RM)"].to_numpy() > df["EPF Wealth (RM)"].to_numpy()
+break_even_year = int(df["Year"].iat[buy_ahead.argmax()]) if buy_ahead.any() else None
 
 # --------------------------
 # 7. Tabs: Chart / Table / Summary
@@ -163,13 +179,16 @@ tab1, tab2, tab3 = st.tabs(["📈 Chart", "📊 Table", "📝 Summary"])
 # ----- Tab 1: Chart -----
 with tab1:
     st.subheader("📈 Scenario Comparison")
+    # All traces submitted in one call, validated once
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df["Year"], y=df["Buy Wealth (RM)"], mode='lines+markers',
-                             name='🏡 Buy Property', line=dict(color='blue', width=3)))
-    fig.add_trace(go.Scatter(x=df["Year"], y=df["EPF Wealth (RM)"], mode='lines+markers',
-                             name='💰 Rent+EPF', line=dict(color='green', width=3)))
-    fig.add_trace(go.Scatter(x=df["Year"], y=df["Cumulative Rent"], mode='lines', 
-                             name='💸 Cumulative Rent', line=dict(color='red', width=2, dash='dash')))
+    fig.add_traces([
+        dict(type='scatter', x=df["Year"], y=df["Buy Wealth (RM)"], mode='lines+markers',
+             name='🏡 Buy Property', line=dict(color='blue', width=3)),
+        dict(type='scatter', x=df["Year"], y=df["EPF Wealth (RM)"], mode='lines+markers',
+             name='💰 Rent+EPF', line=dict(color='green', width=3)),
+        dict(type='scatter', x=df["Year"], y=df["Cumulative Rent"], mode='lines',
+             name='💸 Cumulative Rent', line=dict(color='red', width=2, dash='dash'))
+    ])
     if break_even_year:
         fig.add_vline(x=break_even_year, line=dict(color='orange', dash='dash', width=2))
         fig.add_annotation(x=break_even_year, y=max(df["Buy Wealth (RM)"].max(), df["EPF Wealth (RM)"].max()),
@@ -246,7 +265,7 @@ csv_export = csv_export[[
     "Year", "Buy Wealth (RM)", "EPF Wealth (RM)", "Buy CAGR", "EPF CAGR",
     "Annual Rent", "Cumulative Rent", "Property Value", "Mortgage Balance"
 ]]
-csv_bytes = csv_export.to_csv(index=False).encode('utf-8')
+csv_bytes = to_csv_bytes(csv_export)
 st.download_button(
     label="📥 Download Projection Data (CSV)",
     data=csv_bytes,
@@ -275,49 +294,25 @@ sens_df = pd.DataFrame({
 sens_df["Low"] = sens_df["Base"] * (1 - sensitivity_pct/100)
 sens_df["High"] = sens_df["Base"] * (1 + sensitivity_pct/100)
 
-# Placeholder lists for impacts
-buy_low, buy_high, epf_low, epf_high = [], [], [], []
-
-# Calculate projected outcomes for each parameter scenario
-for idx, row in sens_df.iterrows():
-    param = row["Parameter"]
-
-    # Low scenario
-    if param == "Mortgage Rate":
-        df_low = project_outcomes(initial_property_price, loan_amount, row["Low"], loan_term_years,
-                                  property_growth, epf_rate, rent_yield, projection_years, down_payment, custom_rent)
-    elif param == "Property Growth":
-        df_low = project_outcomes(initial_property_price, loan_amount, mortgage_rate, loan_term_years,
-                                  row["Low"], epf_rate, rent_yield, projection_years, down_payment, custom_rent)
-    elif param == "EPF Rate":
-        df_low = project_outcomes(initial_property_price, loan_amount, mortgage_rate, loan_term_years,
-                                  property_growth, row["Low"], rent_yield, projection_years, down_payment, custom_rent)
-    elif param == "Rent Yield":
-        df_low = project_outcomes(initial_property_price, loan_amount, mortgage_rate, loan_term_years,
-                                  property_growth, epf_rate, row["Low"], projection_years, down_payment, custom_rent)
-    buy_low.append(df_low["Buy Wealth (RM)"].iloc[-1])
-    epf_low.append(df_low["EPF Wealth (RM)"].iloc[-1])
-
-    # High scenario
-    if param == "Mortgage Rate":
-        df_high = project_outcomes(initial_property_price, loan_amount, row["High"], loan_term_years,
-                                   property_growth, epf_rate, rent_yield, projection_years, down_payment, custom_rent)
-    elif param == "Property Growth":
-        df_high = project_outcomes(initial_property_price, loan_amount, mortgage_rate, loan_term_years,
-                                   row["High"], epf_rate, rent_yield, projection_years, down_payment, custom_rent)
-    elif param == "EPF Rate":
-        df_high = project_outcomes(initial_property_price, loan_amount, mortgage_rate, loan_term_years,
-                                   property_growth, row["High"], rent_yield, projection_years, down_payment, custom_rent)
-    elif param == "Rent Yield":
-        df_high = project_outcomes(initial_property_price, loan_amount, mortgage_rate, loan_term_years,
-                                   property_growth, epf_rate, row["High"], projection_years, down_payment, custom_rent)
-    buy_high.append(df_high["Buy Wealth (RM)"].iloc[-1])
-    epf_high.append(df_high["EPF Wealth (RM)"].iloc[-1])
-
-sens_df["Buy Low"] = buy_low
-sens_df["Buy High"] = buy_high
-sens_df["EPF Low"] = epf_low
-sens_df["EPF High"] = epf_high
+# Baseline arguments and the keyword each parameter perturbs
+base_args = dict(P=initial_property_price, loan_amount=loan_amount, mortgage_rate=mortgage_rate,
+                 mortgage_term=loan_term_years, property_growth=property_growth, epf_rate=epf_rate,
+                 rent_yield=rent_yield, years=projection_years, down_payment=down_payment, custom_rent=custom_rent)
+param_args = {
+    "Mortgage Rate": "mortgage_rate",
+    "Property Growth": "property_growth",
+    "EPF Rate": "epf_rate",
+    "Rent Yield": "rent_yield"
+}
+
+# All low/high runs projected in one broadcast call: axis 0 = side, axis 1 = parameter
+batch = {key: np.full((2, len(sens_df), 1), float(base_args[key])) for key in param_args.values()}
+for i, (param, low, high) in enumerate(zip(sens_df["Parameter"], sens_df["Low"], sens_df["High"])):
+    batch[param_args[param]][:, i, 0] = low, high
+_, _, _, buy_wealth, epf_wealth, _, _ = _project_core(**{**base_args, **batch})
+
+sens_df["Buy Low"], sens_df["Buy High"] = buy_wealth[..., -1]
+sens_df["EPF Low"], sens_df["EPF High"] = epf_wealth[..., -1]
 
 # Calculate impacts
 sens_df["Buy Impact"] = sens_df["Buy High"] - sens_df["Buy Low"]
@@ -330,29 +325,27 @@ fig_tornado = go.Figure()
 max_buy_idx = sens_df["Buy Impact"].idxmax()
 max_epf_idx = sens_df["EPF Impact"].idxmax()
 
-for i, row in sens_df.iterrows():
-    buy_color = 'darkblue' if i == max_buy_idx else 'blue'
-    epf_color = 'darkgreen' if i == max_epf_idx else 'green'
-
-    fig_tornado.add_trace(go.Bar(
-        y=[row["Parameter"]],
-        x=[row["Buy High"] - row["Buy Low"]],
-        base=row["Buy Low"],
-        orientation='h',
-        name='🏡 Buy Property' if i==0 else None,
-        marker_color=buy_color,
-        showlegend=i==0
-    ))
-
-    fig_tornado.add_trace(go.Bar(
-        y=[row["Parameter"]],
-        x=[row["EPF High"] - row["EPF Low"]],
-        base=row["EPF Low"],
-        orientation='h',
-        name='💰 Rent+EPF' if i==0 else None,
-        marker_color=epf_color,
-        showlegend=i==0
-    ))
+# One bar trace per scenario, with the largest impact highlighted per bar
+is_max_buy = sens_df.index == max_buy_idx
+is_max_epf = sens_df.index == max_epf_idx
+
+fig_tornado.add_trace(go.Bar(
+    y=sens_df["Parameter"],
+    x=sens_df["Buy High"] - sens_df["Buy Low"],
+    base=sens_df["Buy Low"],
+    orientation='h',
+    name='🏡 Buy Property',
+    marker_color=np.where(is_max_buy, 'darkblue', 'blue')
+))
+
+fig_tornado.add_trace(go.Bar(
+    y=sens_df["Parameter"],
+    x=sens_df["EPF High"] - sens_df["EPF Low"],
+    base=sens_df["EPF Low"],
+    orientation='h',
+    name='💰 Rent+EPF',
+    marker_color=np.where(is_max_epf, 'darkgreen', 'green')
+))
 
 # Add annotations for largest impacts
 fig_tornado.add_annotation(
@@ -382,23 +375,21 @@ st.plotly_chart(fig_tornado, use_container_width=True)
 # --------------------------
 # 3. Impact Table
 # --------------------------
-impact_table = sens_df.copy()
-for col in ["Buy Low", "Buy High", "Buy Impact", "EPF Low", "EPF High", "EPF Impact"]:
-    impact_table[col] = impact_table[col].map(lambda x: f"RM {x:,.0f}")
-
+# RM formatting is applied at render time, so no formatted copy of the table is built
+impact_cols = ["Buy Low", "Buy High", "Buy Impact", "EPF Low", "EPF High", "EPF Impact"]
 st.dataframe(
-    impact_table[["Parameter", "Buy Low", "Buy High", "Buy Impact", "EPF Low", "EPF High", "EPF Impact"]],
+    sens_df[["Parameter"] + impact_cols].style.format({col: "RM {:,.0f}" for col in impact_cols}),
     use_container_width=True
 )
 
 # --------------------------
 # 4. Top Drivers Summary
 # --------------------------
-top_buy_drivers = sens_df.sort_values("Buy Impact", ascending=False).head(2)
-top_epf_drivers = sens_df.sort_values("EPF Impact", ascending=False).head(2)
+top_buy_drivers = sens_df.nlargest(2, "Buy Impact")
+top_epf_drivers = sens_df.nlargest(2, "EPF Impact")
 
-buy_text = ", ".join([f"{row['Parameter']} (RM {row['Buy Impact']:,.0f})" for _, row in top_buy_drivers.iterrows()])
-epf_text = ", ".join([f"{row['Parameter']} (RM {row['EPF Impact']:,.0f})" for _, row in top_epf_drivers.iterrows()])
+buy_text = ", ".join(f"{param} (RM {impact:,.0f})" for param, impact in zip(top_buy_drivers["Parameter"], top_buy_drivers["Buy Impact"]))
+epf_text = ", ".join(f"{param} (RM {impact:,.0f})" for param, impact in zip(top_epf_drivers["Parameter"], top_epf_drivers["EPF Impact"]))
 
 st.markdown(f"""
 - 🏡 **Buy Property – Top Drivers:** {buy_text}  
@@ -21,11 +21,6 @@ from reportlab.lib import colors
 # nltk stopwords
 import nltk
 from nltk.corpus import stopwords
-try:
-    stopwords.words("english")
-except LookupError:
-    nltk.download("punkt")
-    nltk.download("stopwords")
 
 # ----------------------------
 # App config
@@ -51,6 +46,18 @@ BLOG_URLS = [
 
 EXTRA_STOPWORDS = {"akan", "dan", "atau", "yang", "untuk", "dengan", "jika"}
 
+# ----------------------------
+# Cached: stopword set, resolved once per server process
+# ----------------------------
+@st.cache_resource(show_spinner=False)
+def load_stop_words():
+    # Local corpus lookup first; only download when it is genuinely missing
+    try:
+        nltk.data.find("corpora/stopwords")
+    except LookupError:
+        nltk.download("stopwords", quiet=True)
+    return frozenset(stopwords.words("english")) | EXTRA_STOPWORDS
+
 # ----------------------------
 # Utility: fetch one URL text
 # ----------------------------
@@ -88,7 +95,7 @@ def fetch_malaysia_blogs(urls):
 # ----------------------------
 @st.cache_data
 def make_wordcloud_and_freq(text, n_top=20):
-    stop_words = set(stopwords.words("english")) | EXTRA_STOPWORDS
+    stop_words = load_stop_words()
     tokens = re.findall(r"\b[a-zA-Z]{2,}\b", text.lower())
     cleaned = [t for t in tokens if t not in stop_words]
     if not cleaned:
@@ -102,49 +109,73 @@ def make_wordcloud_and_freq(text, n_top=20):
 # ----------------------------
 # Financial model (deterministic/simple)
 # ----------------------------
-@st.cache_data
-def generate_financial_df(mortgage_rate_pct, rent_escalation_pct, investment_return_pct,
-                          years=30, mortgage_term=30, property_price=500000, monthly_rent=1500):
-    mortgage_rate = mortgage_rate_pct / 100.0
-    rent_escalation = rent_escalation_pct / 100.0
-    investment_return = investment_return_pct / 100.0
-
-    df = pd.DataFrame({"Year": np.arange(1, years + 1)})
+def _wealth_model(mortgage_rate, rent_escalation, investment_return, year,
+                  mortgage_term, property_price, monthly_rent):
+    # Rates are fractions; they broadcast against each other and against year on the last axis,
+    # so one model serves both the single scenario and the sensitivity grid
 
     # monthly mortgage payment (fixed-rate annuity)
-    r = mortgage_rate / 12.0
+    r = np.asarray(mortgage_rate) / 12.0
     n = mortgage_term * 12
-    if r == 0:
-        monthly_payment = property_price / n
-    else:
-        monthly_payment = property_price * r * (1 + r) ** n / ((1 + r) ** n - 1)
-
-    df["Monthly_Mortgage"] = monthly_payment
-    df["Annual_Mortgage_Paid"] = monthly_payment * 12
-    df["Cumulative_Mortgage_Paid"] = df["Annual_Mortgage_Paid"].cumsum()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        monthly_payment = np.where(r == 0, property_price / n,
+                                   property_price * r * (1 + r) ** n / ((1 + r) ** n - 1))
+    annual_mortgage_paid = monthly_payment * 12
+    cumulative_mortgage_paid = annual_mortgage_paid * year  # constant payment, so no cumsum
 
     # Simple equity approx (linear principal build; you can refine to full amortization later)
-    df["Home_Equity"] = property_price * (df["Year"] / mortgage_term).clip(upper=1)
-
-    # Annual rent with escalation
-    df["Annual_Rent"] = monthly_rent * 12 * (1 + rent_escalation) ** (df["Year"] - 1)
-
-    # Rent saved each year (mortgage - rent)
-    df["Rent_Saved"] = (df["Annual_Mortgage_Paid"] - df["Annual_Rent"]).clip(lower=0)
+    home_equity = property_price * np.minimum(year / mortgage_term, 1)
+
+    # Annual rent with escalation; rent saved each year (mortgage - rent)
+    annual_rent = monthly_rent * 12 * (1 + rent_escalation) ** (year - 1)
+    rent_saved = np.clip(annual_mortgage_paid - annual_rent, 0, None)
+
+    # Investment value accumulation: total_t = (total_{t-1} + saved_t) * g,
+    # i.e. total_t = g**t * sum_k(saved_k * g / g**k); the cumsum and re-compounding run in place
+    growth = 1 + investment_return
+    compounding = growth ** year
+    investment_value = rent_saved * (growth / compounding)
+    np.cumsum(investment_value, axis=-1, out=investment_value)
+    investment_value *= compounding
+
+    return {
+        "Monthly_Mortgage": monthly_payment,
+        "Annual_Mortgage_Paid": annual_mortgage_paid,
+        "Cumulative_Mortgage_Paid": cumulative_mortgage_paid,
+        "Home_Equity": home_equity,
+        "Annual_Rent": annual_rent,
+        "Rent_Saved": rent_saved,
+        "Investment_Value": investment_value,
+        "Net_Wealth_Buy": home_equity - cumulative_mortgage_paid,
+    }
 
-    # Investment value accumulation
-    invest_values = []
-    total = 0.0
-    for saved in df["Rent_Saved"]:
-        total = (total + saved) * (1 + investment_return)
-        invest_values.append(total)
-    df["Investment_Value"] = invest_values
-
-    df["Net_Wealth_Buy"] = df["Home_Equity"] - df["Cumulative_Mortgage_Paid"]
+@st.cache_data
+def generate_financial_df(mortgage_rate_pct, rent_escalation_pct, investment_return_pct,
+                          years=30, mortgage_term=30, property_price=500000, monthly_rent=1500):
+    year = np.arange(1, years + 1)
+    model = _wealth_model(mortgage_rate_pct / 100.0, rent_escalation_pct / 100.0, investment_return_pct / 100.0,
+                          year, mortgage_term, property_price, monthly_rent)
+    df = pd.DataFrame({"Year": year})
+    for col, values in model.items():
+        df[col] = values
     df["Net_Wealth_Rent"] = df["Investment_Value"]
-
     return df
 
+# ----------------------------
+# Cached: sensitivity grid (same model as above, all scenarios at once)
+# ----------------------------
+@st.cache_data
+def generate_sensitivity_grid(mortgage_rates_pct, rent_escalations_pct, investment_returns_pct,
+                              years=30, mortgage_term=30, property_price=500000, monthly_rent=1500):
+    # Arrays are laid out as (mortgage rate, rent escalation, investment return, year)
+    year = np.arange(1, years + 1)
+    model = _wealth_model(np.asarray(mortgage_rates_pct, dtype=float)[:, None, None, None] / 100.0,
+                          np.asarray(rent_escalations_pct, dtype=float)[None, :, None, None] / 100.0,
+                          np.asarray(investment_returns_pct, dtype=float)[None, None, :, None] / 100.0,
+                          year, mortgage_term, property_price, monthly_rent)
+    # Buy wealth depends only on mortgage rate and year, so it stays (mortgage rate, 1, 1, year)
+    return year, model["Net_Wealth_Buy"], model["Investment_Value"]
+
 # ----------------------------
 # Helper: convert Matplotlib fig to BytesIO (for reportlab embedding)
 # ----------------------------
@@ -299,14 +330,14 @@ if page == "📊 EDA Overview":
     st.write(df_numeric.isna().sum())
 
     st.subheader("Correlation heatmap")
+    numeric_cols = df_numeric.select_dtypes(include=[np.number]).columns
     fig, ax = plt.subplots(figsize=(7,6))
-    cax = ax.matshow(df_numeric.select_dtypes(include=[np.number]).corr(), cmap="coolwarm")
-    plt.xticks(range(len(df_numeric.select_dtypes(include=[np.number]).columns)),
-               df_numeric.select_dtypes(include=[np.number]).columns, rotation=45)
-    plt.yticks(range(len(df_numeric.select_dtypes(include=[np.number]).columns)),
-               df_numeric.select_dtypes(include=[np.number]).columns)
+    cax = ax.matshow(df_numeric[numeric_cols].corr(), cmap="coolwarm")
+    ax.set_xticks(range(len(numeric_cols)), numeric_cols, rotation=45)
+    ax.set_yticks(range(len(numeric_cols)), numeric_cols)
     fig.colorbar(cax)
     st.pyplot(fig)
+    plt.close(fig)
 
 elif page == "📈 Wealth Comparison":
     st.title("📈 Wealth Comparison")
@@ -330,18 +361,18 @@ elif page == "⚖️ Sensitivity Analysis":
     invest_range = st.sidebar.slider("Investment Return Range (%)", 3.0, 12.0, (5.0, 9.0), 0.5)
     steps = st.sidebar.number_input("Steps per parameter", min_value=2, max_value=6, value=3)
 
+    mortgage_steps = np.linspace(mortgage_range[0], mortgage_range[1], steps)
+    rent_steps = np.linspace(rent_range[0], rent_range[1], steps)
+    invest_steps = np.linspace(invest_range[0], invest_range[1], steps)
+    year, buy_grid, rent_grid = generate_sensitivity_grid(mortgage_steps, rent_steps, invest_steps, years=years,
+                                                          mortgage_term=mortgage_term,
+                                                          property_price=property_price,
+                                                          monthly_rent=monthly_rent)
+
     fig_sens, ax_sens = plt.subplots(figsize=(9,5))
-    scenarios = []
-    for m in np.linspace(mortgage_range[0], mortgage_range[1], steps):
-        for re_ in np.linspace(rent_range[0], rent_range[1], steps):
-            for ir in np.linspace(invest_range[0], invest_range[1], steps):
-                df_test = generate_financial_df(m, re_, ir, years=years,
-                                               mortgage_term=mortgage_term,
-                                               property_price=property_price,
-                                               monthly_rent=monthly_rent)
-                ax_sens.plot(df_test["Year"], df_test["Net_Wealth_Rent"], color="green", alpha=0.12)
-                ax_sens.plot(df_test["Year"], df_test["Net_Wealth_Buy"], color="blue", alpha=0.12)
-                scenarios.append((m, re_, ir, df_test.iloc[-1]["Net_Wealth_Rent"]))
+    # One column per scenario, so each series is drawn with a single plot call
+    ax_sens.plot(year, rent_grid.reshape(-1, len(year)).T, color="green", alpha=0.12)
+    ax_sens.plot(year, np.broadcast_to(buy_grid, rent_grid.shape).reshape(-1, len(year)).T, color="blue", alpha=0.12)
     ax_sens.set_title("Sensitivity Analysis (many scenarios overlayed)")
     ax_sens.set_xlabel("Year"); ax_sens.set_ylabel("Net Wealth (RM)")
     ax_sens.grid(True)
@@ -349,12 +380,16 @@ elif page == "⚖️ Sensitivity Analysis":
 
     sens_buf = fig_to_bytes(fig_sens)
 
-    if scenarios:
-        sens_df = pd.DataFrame(scenarios, columns=["MortgageRate", "RentEscalation", "InvestReturn", "FinalRentWealth"])
-        st.subheader("Sample sensitivity results (final-year rent wealth)")
-        st.dataframe(sens_df.sort_values("FinalRentWealth", ascending=False).head(10))
-    else:
-        st.info("No scenarios generated.")
+    # Flat key columns laid out in the grid's C order, so one frame is built with no reshuffling
+    n_mr, n_re, n_ir = len(mortgage_steps), len(rent_steps), len(invest_steps)
+    sens_df = pd.DataFrame({
+        "MortgageRate": np.repeat(mortgage_steps, n_re * n_ir),
+        "RentEscalation": np.tile(np.repeat(rent_steps, n_ir), n_mr),
+        "InvestReturn": np.tile(invest_steps, n_mr * n_re),
+        "FinalRentWealth": rent_grid[..., -1].ravel()
+    })
+    st.subheader("Sample sensitivity results (final-year rent wealth)")
+    st.dataframe(sens_df.nlargest(10, "FinalRentWealth"))
 
 elif page == "☁️ WordCloud (Malaysia Blogs)":
     st.title("☁️ WordCloud (Malaysia Blogs)")
@@ -389,13 +424,15 @@ elif page == "🔗 Combined Insights":
     st.subheader("Sensitivity (example overlay)")
     fig_sens2, ax_sens2 = plt.subplots(figsize=(6,4))
     invest_rates = [0.03, 0.05, 0.07]
+    # One grid call: the mortgage payment and rent escalation factor are shared by every return
+    sens_year, _, sens_rent = generate_sensitivity_grid((mortgage_rate,), (rent_escalation,),
+                                                        tuple(r*100 for r in invest_rates), years=years,
+                                                        mortgage_term=mortgage_term, property_price=property_price,
+                                                        monthly_rent=monthly_rent)
     sens_results = []
-    for r in invest_rates:
-        df_tmp = generate_financial_df(mortgage_rate, rent_escalation, r*100, years=years,
-                                       mortgage_term=mortgage_term, property_price=property_price,
-                                       monthly_rent=monthly_rent)
-        ax_sens2.plot(df_tmp["Year"], df_tmp["Net_Wealth_Rent"], label=f"Invest {int(r*100)}%")
-        sens_results.append((f"Invest {int(r*100)}%", df_tmp.iloc[-1]["Net_Wealth_Rent"]))
+    for r, rent_path in zip(invest_rates, sens_rent[0, 0]):
+        ax_sens2.plot(sens_year, rent_path, label=f"Invest {int(r*100)}%")
+        sens_results.append((f"Invest {int(r*100)}%", rent_path[-1]))
     ax_sens2.plot(df_numeric["Year"], df_numeric["Net_Wealth_Buy"], label="Buy (Net)", color="black", linewidth=2)
     ax_sens2.set_xlabel("Year"); ax_sens2.set_ylabel("Net Wealth (RM)")
     ax_sens2.legend(); ax_sens2.grid(True)
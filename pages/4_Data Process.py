@@ -2,7 +2,8 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import os
+import io
+from pathlib import Path
 
 st.set_page_config(page_title='Data Process', layout='wide')
 
@@ -10,22 +11,28 @@ st.set_page_config(page_title='Data Process', layout='wide')
 # Load Data (Uploader + GitHub fallback)
 # ---------------------------------------------
 @st.cache_data
-def load_data(path="https://raw.githubusercontent.com/Lufenny/financial-dashboard/main/Data.csv"):
+def load_data(path="https://raw.githubusercontent.com/Lufenny/financial-dashboard/main/Data.csv", mtime=None):
+    # mtime only feeds the cache key, so an edited local file is re-read
     return pd.read_csv(path)
 
+@st.cache_data
+def load_uploaded(data):
+    return pd.read_csv(io.BytesIO(data))
+
 st.title("⚙️ Data Processing Dashboard")
 
 uploaded_file = st.file_uploader("Upload your dataset (CSV)", type=["csv"])
+local_path = Path("Data.csv")
 if uploaded_file is not None:
-    df = pd.read_csv(uploaded_file)
-elif os.path.exists("Data.csv"):
-    df = pd.read_csv("Data.csv")
+    df = load_uploaded(uploaded_file.getvalue())
+elif local_path.exists():
+    df = load_data(str(local_path), local_path.stat().st_mtime)
 else:
     df = load_data()
 
 # === Data Collection
 st.header("✅ Data Collection")
-years = sorted(df["Year"].dropna().unique())
+years = np.unique(df["Year"].dropna().to_numpy())  # sorted distinct years in one native pass
 st.write(f"**Total records:** {len(df)}")
 st.write(f"**Years detected:** {years[0]} to {years[-1]}  \n(**{len(years)} years in total**)")
 
@@ -78,6 +85,7 @@ if corr.empty:
     st.write("No numeric columns available to compute correlations.")
 else:
     fig, ax = plt.subplots(figsize=(8, 6))
+    fig.set_layout_engine("tight")  # laid out once at draw time
     im = ax.imshow(corr.values, cmap="Blues", vmin=-1, vmax=1)
     ax.set_xticks(np.arange(len(corr.columns)))
     ax.set_yticks(np.arange(len(corr.index)))
@@ -93,8 +101,8 @@ else:
 
     fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
     ax.set_title("Correlation Matrix")
-    plt.tight_layout()
     st.pyplot(fig)
+    plt.close(fig)
 
 # === Download full CSV
 csv = df_clean.to_csv(index=False).encode("utf-8")
@@ -114,7 +122,11 @@ min_year, max_year = st.slider(
     value=(int(years[0]), int(years[-1])),
     step=1
 )
-filtered_df = df_clean[(df_clean["Year"] >= min_year) & (df_clean["Year"] <= max_year)]
+# One boolean buffer: the upper-bound test is ANDed into the lower-bound mask in place
+year_values = df_clean["Year"].to_numpy()
+in_range = year_values >= min_year
+np.logical_and(in_range, year_values <= max_year, out=in_range)
+filtered_df = df_clean[in_range]
 
 # === Trend Chart(s) with basic observations
 st.header("📉 Trend Chart(s)")
@@ -141,6 +153,7 @@ for col in selected_columns:
         ax.set_ylabel(chart_options[col])
         ax.set_title(f"{chart_options[col]} vs Year")
         st.pyplot(fig)
+        plt.close(fig)  # one figure per selected column; don't let them pile up across reruns
 
         # Add observation (first vs last value)
         start_val, end_val = filtered_df[col].iloc[0], filtered_df[col].iloc[-1]
@@ -1,5 +1,8 @@
+import io
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pac
 import numpy as np
 import plotly.graph_objects as go
 
@@ -21,48 +24,62 @@ st.title("🏡 Buy Property vs 💰 Rent+EPF: Wealth Projection & Sensitivity An
 # 2. Helper Functions
 # --------------------------
 def calculate_monthly_mortgage(loan_amount, annual_rate, years):
-    r = annual_rate / 12
+    # Element-wise over rate arrays
+    r = np.asarray(annual_rate) / 12
     n = years * 12
-    return loan_amount * (r * (1 + r)**n) / ((1 + r)**n - 1) if r > 0 else loan_amount / n
-
+    f = (1 + r)**n  # compounding factor, computed once
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(r > 0, loan_amount * r * f / (f - 1), loan_amount / n)
+
+def _project_core(P, loan_amount, mortgage_rate, mortgage_term,
+                  property_growth, epf_rate, rent_yield, years,
+                  down_payment=0, custom_rent=None):
+    # Numeric core shared verbatim by Expected Outcomes and Modelling: yearly series as NumPy arrays.
+    # Rates may carry leading axes, e.g. shape (k, 1), to project k scenarios at once.
+    annual_PMT = calculate_monthly_mortgage(loan_amount, mortgage_rate, mortgage_term) * 12
+    t = np.arange(0, years + 1)
+
+    # Closed forms of the yearly recurrences (no Python loop over years)
+    property_values = P * (1 + property_growth)**t
+
+    # B_t = B_{t-1}*(1 + rate) - annual_PMT, floored at zero once the loan is repaid
+    rate_growth = (1 + mortgage_rate)**t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mortgage_balances = np.where(mortgage_rate > 0,
+                                     loan_amount*rate_growth - annual_PMT*(rate_growth - 1)/mortgage_rate,
+                                     loan_amount - annual_PMT*t)
+    mortgage_balances = np.maximum(mortgage_balances, 0)
+
+    buy_wealth = property_values - mortgage_balances
+    buy_wealth[..., 0] = down_payment  # Year 0
+
+    rents = np.full_like(property_values, float(custom_rent)) if custom_rent is not None else property_values * rent_yield
+    cum_rent = np.cumsum(rents, axis=-1)
+
+    # Leftover goes to EPF with monthly compounding:
+    # w_t = w_{t-1}*g + investable_t  =>  w_t = g**t * sum_k(investable_k / g**k)
+    investable = np.maximum(0, annual_PMT - rents)
+    investable[..., 0] = down_payment  # Year 0
+    epf_compounding = ((1 + epf_rate/12)**12)**t
+    epf_wealth = epf_compounding * np.cumsum(investable / epf_compounding, axis=-1)
+
+    return t, property_values, mortgage_balances, buy_wealth, epf_wealth, rents, cum_rent
+
+@st.cache_data(show_spinner=False, max_entries=128)
 def project_buy_rent(P, loan_amount, mortgage_rate, mortgage_term,
                      property_growth, epf_rate, rent_yield, years,
                      down_payment=0, custom_rent=None):
-    monthly_PMT = calculate_monthly_mortgage(loan_amount, mortgage_rate, mortgage_term)
-    property_values = [P]
-    mortgage_balances = [loan_amount]
-    buy_wealth = [down_payment]
-    epf_wealth = [down_payment]
-    rents = []
-    cum_rent = []
-
-    annual_rent = custom_rent if custom_rent else P * rent_yield
-    rents.append(annual_rent)
-    cum_rent.append(annual_rent)
-
-    for t in range(1, years + 1):
-        new_property_value = property_values[-1] * (1 + property_growth)
-        property_values.append(new_property_value)
-
-        interest_payment = mortgage_balances[-1] * mortgage_rate
-        principal_payment = monthly_PMT*12 - interest_payment
-        new_balance = max(0, mortgage_balances[-1] - principal_payment)
-        mortgage_balances.append(new_balance)
+    t, property_values, mortgage_balances, buy_wealth, epf_wealth, rents, cum_rent = _project_core(
+        P, loan_amount, mortgage_rate, mortgage_term, property_growth, epf_rate, rent_yield, years,
+        down_payment, custom_rent)
 
-        buy_wealth.append(new_property_value - new_balance)
+    cagr_exponent = 1 / np.maximum(t, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        buy_cagr = np.where(t > 0, (buy_wealth/buy_wealth[0])**cagr_exponent - 1, 0.0)
+        epf_cagr = np.where(t > 0, (epf_wealth/epf_wealth[0])**cagr_exponent - 1, 0.0)
 
-        annual_rent = custom_rent if custom_rent else new_property_value * rent_yield
-        rents.append(annual_rent)
-        cum_rent.append(cum_rent[-1] + annual_rent)
-
-        investable = max(0, monthly_PMT*12 - annual_rent)
-        epf_wealth.append(epf_wealth[-1]*(1 + epf_rate/12)**12 + investable)
-
-    buy_cagr = [( (buy_wealth[i]/buy_wealth[0])**(1/i) - 1 if i>0 else 0) for i in range(len(buy_wealth))]
-    epf_cagr = [( (epf_wealth[i]/epf_wealth[0])**(1/i) - 1 if i>0 else 0) for i in range(len(epf_wealth))]
-
-    return pd.DataFrame({
-        "Year": np.arange(0, years + 1),
+    # float32 is ample for RM amounts
+    df = pd.DataFrame({
         "Property Value": property_values,
         "Mortgage Balance": mortgage_balances,
         "Buy Wealth (RM)": buy_wealth,
@@ -71,7 +88,77 @@ def project_buy_rent(P, loan_amount, mortgage_rate, mortgage_term,
         "Cumulative Rent": cum_rent,
         "Buy CAGR": buy_cagr,
         "EPF CAGR": epf_cagr
-    })
+    }, dtype=np.float32)
+    df.insert(0, "Year", t.astype(np.int16))
+    return df
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def run_sensitivity(purchase_price, loan_amount, mortgage_rate, property_growth, epf_rate, rent_yield,
+                    mortgage_term, projection_years, down_payment, custom_rent, sensitivity_pct):
+    base_kwargs = dict(P=purchase_price, loan_amount=loan_amount, mortgage_rate=mortgage_rate, mortgage_term=mortgage_term,
+                       property_growth=property_growth, epf_rate=epf_rate, rent_yield=rent_yield, years=projection_years,
+                       down_payment=down_payment, custom_rent=custom_rent)
+    # Parameter label -> projection keyword it perturbs
+    params = {
+        "Mortgage Rate": "mortgage_rate",
+        "Property Growth": "property_growth",
+        "EPF Rate": "epf_rate",
+        "Rent Yield": "rent_yield"
+    }
+
+    # One row per perturbed run (low/high for each parameter), projected in a single batch
+    names = list(params)
+    batch = {key: np.full((2*len(params), 1), float(base_kwargs[key])) for key in params.values()}
+    for i, key in enumerate(params.values()):
+        batch[key][2*i] *= 1 - sensitivity_pct/100
+        batch[key][2*i + 1] *= 1 + sensitivity_pct/100
+
+    # Only the final-year wealth is needed, so skip the DataFrame assembly
+    _, _, _, buy_wealth, epf_wealth, _, _ = _project_core(**{**base_kwargs, **batch})
+    buy_low, buy_high = buy_wealth[0::2, -1], buy_wealth[1::2, -1]
+    epf_low, epf_high = epf_wealth[0::2, -1], epf_wealth[1::2, -1]
+
+    return pd.DataFrame({
+        "Parameter": names,
+        "Buy Low": buy_low,
+        "Buy High": buy_high,
+        "Buy Impact": buy_high - buy_low,
+        "EPF Low": epf_low,
+        "EPF High": epf_high,
+        "EPF Impact": epf_high - epf_low
+    }).astype({col: np.float32 for col in ["Buy Low", "Buy High", "Buy Impact", "EPF Low", "EPF High", "EPF Impact"]})
+
+@st.cache_data(show_spinner=False)
+def to_csv_bytes(df):
+    # Arrow's native CSV writer
+    buf = io.BytesIO()
+    pac.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+    return buf.getvalue()
+
+# Figures are cached on their inputs so tab clicks and unrelated widgets skip Plotly assembly
+@st.cache_data(show_spinner=False)
+def build_wealth_fig(year, buy_wealth, epf_wealth, break_even_year, projection_years):
+    # Plain arrays in, so the cache hashes and Plotly serializes them without pandas in between;
+    # all traces are submitted in one call and validated once
+    fig = go.Figure()
+    fig.add_traces([
+        dict(type='scattergl', x=year, y=buy_wealth, mode='lines+markers', name='🏡 Buy Property', line=dict(color='royalblue', width=3)),
+        dict(type='scattergl', x=year, y=epf_wealth, mode='lines+markers', name='💰 Rent+EPF', line=dict(color='seagreen', width=3))
+    ])
+    if break_even_year:
+        fig.add_vline(x=break_even_year, line=dict(color='orange', dash='dash', width=2))
+        fig.add_annotation(x=break_even_year, y=max(buy_wealth.max(), epf_wealth.max()),
+                           text=f"📍 Break-even Year: {break_even_year}", showarrow=True, arrowhead=2, ax=-40, ay=-40, font=dict(color="orange", size=12))
+    fig.update_layout(title=f"Wealth Projection ({projection_years} Years)", xaxis_title="Year", yaxis_title="Wealth (RM)", template="plotly_white")
+    return fig
+
+@st.cache_data(show_spinner=False)
+def build_tornado(df_sensitivity, col_low, col_high, color, title):
+    impact = (df_sensitivity[col_high] - df_sensitivity[col_low]).to_numpy()
+    order = np.argsort(impact)  # ascending, so the largest bar sits on top
+    fig = go.Figure(go.Bar(x=impact[order], y=df_sensitivity['Parameter'].to_numpy()[order], orientation='h', marker_color=color))
+    fig.update_layout(title=title, xaxis_title='Impact (RM)', yaxis_title='')
+    return fig
 
 # --------------------------
 # 3. Sidebar Inputs
@@ -91,6 +178,7 @@ projection_years = st.sidebar.number_input("Projection Years", value=30, step=5)
 
 use_custom_rent = st.sidebar.checkbox("Use Custom Starting Rent?")
 custom_rent = st.sidebar.number_input("Custom Starting Annual Rent (RM)", value=20000, step=1000) if use_custom_rent else None
+custom_rent = custom_rent or None  # on this page a custom rent of 0 falls back to the rent yield
 
 sensitivity_pct = st.sidebar.slider("Sensitivity Range (%)", min_value=1, max_value=50, value=10, step=1)
 
@@ -110,7 +198,14 @@ df = project_buy_rent(
     custom_rent=custom_rent
 )
 
-break_even_year = next((row.Year for i,row in df.iterrows() if row["Buy Wealth (RM)"] > row["EPF Wealth (RM)"]), None)
+# Plot-ready arrays pulled out once; the DataFrame itself is kept for the table and CSV
+year = df["Year"].to_numpy()
+buy_wealth = df["Buy Wealth (RM)"].to_numpy()
+epf_wealth = df["EPF Wealth (RM)"].to_numpy()
+
+# First year in which buying is ahead
+buy_ahead = buy_wealth > epf_wealth
+break_even_year = int(year[buy_ahead.argmax()]) if buy_ahead.any() else None
 
 # --------------------------
 # 5. Tabs
@@ -119,14 +214,7 @@ tab1, tab2, tab3 = st.tabs(["📈 Chart", "📊 Table", "📝 Summary"])
 
 with tab1:
     st.subheader("📈 Wealth Projection Over Time")
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df["Year"], y=df["Buy Wealth (RM)"], mode='lines+markers', name='🏡 Buy Property', line=dict(color='royalblue', width=3)))
-    fig.add_trace(go.Scatter(x=df["Year"], y=df["EPF Wealth (RM)"], mode='lines+markers', name='💰 Rent+EPF', line=dict(color='seagreen', width=3)))
-    if break_even_year:
-        fig.add_vline(x=break_even_year, line=dict(color='orange', dash='dash', width=2))
-        fig.add_annotation(x=break_even_year, y=max(df["Buy Wealth (RM)"].max(), df["EPF Wealth (RM)"].max()),
-                           text=f"📍 Break-even Year: {break_even_year}", showarrow=True, arrowhead=2, ax=-40, ay=-40, font=dict(color="orange", size=12))
-    fig.update_layout(title=f"Wealth Projection ({projection_years} Years)", xaxis_title="Year", yaxis_title="Wealth (RM)", template="plotly_white")
+    fig = build_wealth_fig(year, buy_wealth, epf_wealth, break_even_year, projection_years)
     st.plotly_chart(fig, use_container_width=True)
 
 with tab2:
@@ -135,8 +223,8 @@ with tab2:
 
 with tab3:
     st.subheader("📝 Summary")
-    final_buy = df["Buy Wealth (RM)"].iloc[-1]
-    final_epf = df["EPF Wealth (RM)"].iloc[-1]
+    final_buy = buy_wealth[-1]
+    final_epf = epf_wealth[-1]
     winner_value = "🏡 Buy Property" if final_buy>final_epf else "💰 Rent+EPF"
     st.markdown(f"""
 ### Key Outcomes
@@ -149,40 +237,8 @@ with tab3:
 # --------------------------
 # 6. Sensitivity Analysis
 # --------------------------
-params = {
-    "Mortgage Rate": mortgage_rate,
-    "Property Growth": property_growth,
-    "EPF Rate": epf_rate,
-    "Rent Yield": rent_yield
-}
-
-sensitivity_results = []
-
-for param_name, base_val in params.items():
-    low = base_val*(1 - sensitivity_pct/100)
-    high = base_val*(1 + sensitivity_pct/100)
-
-    kwargs_low = dict(P=purchase_price, loan_amount=loan_amount, mortgage_rate=mortgage_rate, mortgage_term=mortgage_term,
-                      property_growth=property_growth, epf_rate=epf_rate, rent_yield=rent_yield, years=projection_years,
-                      down_payment=down_payment, custom_rent=custom_rent)
-    kwargs_low[param_name.replace(" ", "_").lower()] = low
-    df_low = project_buy_rent(**kwargs_low)
-
-    kwargs_high = kwargs_low.copy()
-    kwargs_high[param_name.replace(" ", "_").lower()] = high
-    df_high = project_buy_rent(**kwargs_high)
-
-    sensitivity_results.append({
-        "Parameter": param_name,
-        "Buy Low": df_low["Buy Wealth (RM)"].iloc[-1],
-        "Buy High": df_high["Buy Wealth (RM)"].iloc[-1],
-        "Buy Impact": df_high["Buy Wealth (RM)"].iloc[-1] - df_low["Buy Wealth (RM)"].iloc[-1],
-        "EPF Low": df_low["EPF Wealth (RM)"].iloc[-1],
-        "EPF High": df_high["EPF Wealth (RM)"].iloc[-1],
-        "EPF Impact": df_high["EPF Wealth (RM)"].iloc[-1] - df_low["EPF Wealth (RM)"].iloc[-1]
-    })
-
-df_sensitivity = pd.DataFrame(sensitivity_results)
+df_sensitivity = run_sensitivity(purchase_price, loan_amount, mortgage_rate, property_growth, epf_rate, rent_yield,
+                                 mortgage_term, projection_years, down_payment, custom_rent, sensitivity_pct)
 
 st.subheader(f"🌪️ Sensitivity Analysis (±{sensitivity_pct}%)")
 st.dataframe(df_sensitivity, use_container_width=True)
@@ -191,24 +247,16 @@ st.dataframe(df_sensitivity, use_container_width=True)
 st.subheader("🎯 Tornado Charts")
 
 # Buy Wealth
-df_buy = df_sensitivity[['Parameter', 'Buy Low', 'Buy High']].copy()
-df_buy['Impact'] = df_buy['Buy High'] - df_buy['Buy Low']
-df_buy = df_buy.sort_values('Impact', ascending=True)
-fig_buy = go.Figure(go.Bar(x=df_buy['Impact'], y=df_buy['Parameter'], orientation='h', marker_color='royalblue'))
-fig_buy.update_layout(title='Buy Wealth Sensitivity', xaxis_title='Impact (RM)', yaxis_title='')
+fig_buy = build_tornado(df_sensitivity, 'Buy Low', 'Buy High', 'royalblue', 'Buy Wealth Sensitivity')
 st.plotly_chart(fig_buy, use_container_width=True)
 
 # EPF Wealth
-df_epf = df_sensitivity[['Parameter', 'EPF Low', 'EPF High']].copy()
-df_epf['Impact'] = df_epf['EPF High'] - df_epf['EPF Low']
-df_epf = df_epf.sort_values('Impact', ascending=True)
-fig_epf = go.Figure(go.Bar(x=df_epf['Impact'], y=df_epf['Parameter'], orientation='h', marker_color='seagreen'))
-fig_epf.update_layout(title='EPF Wealth Sensitivity', xaxis_title='Impact (RM)', yaxis_title='')
+fig_epf = build_tornado(df_sensitivity, 'EPF Low', 'EPF High', 'seagreen', 'EPF Wealth Sensitivity')
 st.plotly_chart(fig_epf, use_container_width=True)
 
 # Top drivers summary cards
-top_buy = df_sensitivity.sort_values("Buy Impact", ascending=False).iloc[0]
-top_epf = df_sensitivity.sort_values("EPF Impact", ascending=False).iloc[0]
+top_buy = df_sensitivity.loc[df_sensitivity["Buy Impact"].idxmax()]
+top_epf = df_sensitivity.loc[df_sensitivity["EPF Impact"].idxmax()]
 
 st.markdown(f"""
 ### 🏆 Top Drivers
@@ -219,5 +267,5 @@ st.markdown(f"""
 # --------------------------
 # 7. CSV Download
 # --------------------------
-csv_bytes = df.to_csv(index=False).encode('utf-8')
+csv_bytes = to_csv_bytes(df)
 st.download_button("📥 Download Projection Data (CSV)", data=csv_bytes, file_name="buy_vs_rent_epf_projection.csv", mime="text/csv")
@@ -1,11 +1,59 @@
+import io
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pac
+import numpy as np
 import matplotlib.pyplot as plt
-from itertools import cycle
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 
 st.set_page_config(page_title='Results & Interpretation', layout='wide')
 st.title("📑 Results & Interpretation (Multi-Scenario)")
 
+# --------------------------
+# Cached Helpers
+# --------------------------
+@st.cache_data(show_spinner=False, ttl=3600)
+def load_sensitivity_csv(data):
+    # Keyed on the uploaded bytes, so reruns skip re-parsing the same file.
+    df = pd.read_csv(io.BytesIO(data))
+    df.columns = df.columns.str.strip()
+    # Narrowed after parsing, so blank cells and short rows still load; rows without a Year are dropped
+    if "Year" in df:
+        df = df.dropna(subset=["Year"])
+        df["Year"] = pd.to_numeric(df["Year"], downcast="integer")
+    for col in ("BuyEquity", "RentPortfolio", "Difference"):
+        if col in df:
+            df[col] = df[col].astype("float32")
+    # Low-cardinality scenario keys: categorical makes the filters integer-code comparisons
+    for col in ("MortgageRate", "InvestReturn", "Appreciation", "RentYield"):
+        if col in df:
+            df[col] = df[col].astype("category")
+    return df
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def index_by_scenario(data):
+    # Sorted MultiIndex over the scenario keys plus Year, built once per upload,
+    # so every selection comes back with each scenario already in year order
+    return load_sensitivity_csv(data).set_index(
+        ["MortgageRate", "InvestReturn", "Appreciation", "RentYield", "Year"]).sort_index()
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def filter_scenarios(data, columns, mortgages, returns, app, ry):
+    # Keyed on the selection tuples, so reruns from unrelated widgets reuse the filtered frame
+    try:
+        selected = index_by_scenario(data).loc[pd.IndexSlice[list(mortgages), list(returns), app, ry, :], :]
+    except KeyError:
+        return pd.DataFrame(columns=list(columns))
+    return selected.reset_index()[list(columns)]
+
+@st.cache_data(show_spinner=False)
+def to_csv_bytes(df):
+    buf = io.BytesIO()
+    pac.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+    return buf.getvalue()
+
 # --------------------------
 # Upload Sensitivity CSV
 # --------------------------
@@ -16,29 +64,40 @@ uploaded_file = st.sidebar.file_uploader(
     key="upload_csv"
 )
 
+# The uploader resets when navigating between pages, so the last valid upload is kept in session state
 if uploaded_file is not None:
-    df_sens = pd.read_csv(uploaded_file)
-    df_sens.columns = df_sens.columns.str.strip()
-    
-    required_cols = ["Year","MortgageRate","InvestReturn","Appreciation","RentYield",
-                     "BuyEquity","RentPortfolio","Difference"]
-    missing = [c for c in required_cols if c not in df_sens.columns]
-    if missing:
-        st.error(f"CSV is missing required columns: {missing}")
-        st.stop()
+    csv_data = uploaded_file.getvalue()
+elif "sens_csv_data" in st.session_state:
+    csv_data = st.session_state["sens_csv_data"]
+    st.sidebar.caption("Using the previously uploaded sensitivity results.")
 else:
     st.warning("Please upload 'buy_vs_rent_sensitivity.csv' from the Modelling page to proceed.")
     st.stop()
 
+try:
+    df_sens = load_sensitivity_csv(csv_data)
+except ValueError as e:  # parser, encoding and numeric conversion errors
+    st.error(f"Could not read the uploaded CSV: {e}")
+    st.stop()
+
+required_cols = ["Year","MortgageRate","InvestReturn","Appreciation","RentYield",
+                 "BuyEquity","RentPortfolio","Difference"]
+missing = [c for c in required_cols if c not in df_sens.columns]
+if missing:
+    st.error(f"CSV is missing required columns: {missing}")
+    st.stop()
+st.session_state["sens_csv_data"] = csv_data
+
 # --------------------------
 # Multi-Scenario Selection
 # --------------------------
 st.sidebar.header("Select Scenarios to Compare")
 
-mortgage_options = sorted(df_sens["MortgageRate"].unique())
-return_options = sorted(df_sens["InvestReturn"].unique())
-appreciation_options = sorted(df_sens["Appreciation"].unique())
-rent_yield_options = sorted(df_sens["RentYield"].unique())
+# Categories are already the sorted unique values
+mortgage_options = list(df_sens["MortgageRate"].cat.categories)
+return_options = list(df_sens["InvestReturn"].cat.categories)
+appreciation_options = list(df_sens["Appreciation"].cat.categories)
+rent_yield_options = list(df_sens["RentYield"].cat.categories)
 
 selected_mortgages = st.sidebar.multiselect(
     "Mortgage Rate (%)", mortgage_options, default=[mortgage_options[0]], key="mortgage_filter"
@@ -52,6 +111,10 @@ selected_app = st.sidebar.selectbox(
 selected_ry = st.sidebar.selectbox(
     "Rental Yield (%)", rent_yield_options, key="rent_filter"
 )
+high_res_plot = st.sidebar.checkbox(
+    "High-resolution plot", value=False, key="high_res_plot",
+    help="Draw every year even when many scenarios are selected."
+)
 
 if not selected_mortgages or not selected_returns:
     st.warning("Please select at least one mortgage rate and one return rate.")
@@ -60,12 +123,10 @@ if not selected_mortgages or not selected_returns:
 # --------------------------
 # Filter Data
 # --------------------------
-df_plot = df_sens[
-    (df_sens["MortgageRate"].isin(selected_mortgages)) &
-    (df_sens["InvestReturn"].isin(selected_returns)) &
-    (df_sens["Appreciation"] == selected_app) &
-    (df_sens["RentYield"] == selected_ry)
-]
+# Sorted-index lookup instead of four full-length boolean masks; the selections are sorted so
+# scenarios come back in (MortgageRate, InvestReturn) order regardless of click order
+df_plot = filter_scenarios(csv_data, tuple(df_sens.columns), tuple(sorted(selected_mortgages)),
+                           tuple(sorted(selected_returns)), selected_app, selected_ry)
 
 if df_plot.empty:
     st.warning("No matching scenarios found for the selected filters.")
@@ -76,51 +137,80 @@ if df_plot.empty:
 # --------------------------
 st.subheader("📊 Multi-Scenario Wealth Trajectories Over Time")
 
-scenario_colors = plt.cm.tab10.colors  # Use tab10 colormap
-color_cycle = cycle(scenario_colors)
+# Fixed per-series styles, built once rather than spelled out on every plot call
+buy_style = dict(marker='o', linestyle='-')
+rent_style = dict(marker='x', linestyle='--')
 
 fig, ax = plt.subplots(figsize=(10,6))
+fig.set_layout_engine('tight')
+
+# Scenario = MortgageRate + InvestReturn. Rows arrive from the sorted index ordered by
+# (MortgageRate, InvestReturn, Year), so each scenario is a contiguous run: split at the
+# points where the combined category code changes instead of hash-grouping
+mr_col, ir_col = df_plot['MortgageRate'], df_plot['InvestReturn']
+scenario_key = mr_col.cat.codes.to_numpy(np.int64) * len(ir_col.cat.categories) + ir_col.cat.codes.to_numpy()
+starts = np.flatnonzero(np.r_[True, np.diff(scenario_key) != 0])
+points = df_plot[['Year', 'BuyEquity', 'RentPortfolio']].to_numpy(np.float64)
+
+# Many selected scenarios mean thousands of segments to rasterize: past MAX_PLOT_POINTS, keep every
+# stride-th year of each run plus its final year (the table below always uses full resolution)
+MAX_PLOT_POINTS = 2000
+stride = 1 if high_res_plot else max(1, -(-len(points) // MAX_PLOT_POINTS))  # ceiling division
+
+# Colors follow each scenario's position in the (sorted mortgage x sorted return) selection grid,
+# resolved for all runs at once into one tab10 RGBA array
+mr_rank = np.searchsorted(mr_col.cat.categories.get_indexer(sorted(selected_mortgages)), mr_col.cat.codes.to_numpy()[starts])
+ir_rank = np.searchsorted(ir_col.cat.categories.get_indexer(sorted(selected_returns)), ir_col.cat.codes.to_numpy()[starts])
+line_colors = plt.cm.tab10((mr_rank * len(selected_returns) + ir_rank) % 10)
+
+# One polyline per scenario; each series is then drawn as a single collection instead of one artist per group
+buy_lines, rent_lines, legend_handles = [], [], []
+for start, block, color in zip(starts, np.split(points, starts[1:]), line_colors):
+    mr, ir = mr_col.iat[start], ir_col.iat[start]
+    if stride > 1:
+        block = np.concatenate([block[:-1:stride], block[-1:]])
+    buy_lines.append(block[:, [0, 1]])
+    rent_lines.append(block[:, [0, 2]])
 
-# Group by scenario: MortgageRate + InvestReturn
-grouped = df_plot.groupby(['MortgageRate','InvestReturn'])
-for (mr, ir), group in grouped:
-    group_sorted = group.sort_values('Year')
-    color = next(color_cycle)
-    
     label_buy = f"MR:{mr}%, IR:{ir}% Buy"
     label_rent = f"MR:{mr}%, IR:{ir}% Rent"
-    
-    ax.plot(group_sorted['Year'], group_sorted['BuyEquity'], marker='o', linestyle='-', color=color, label=label_buy)
-    ax.plot(group_sorted['Year'], group_sorted['RentPortfolio'], marker='x', linestyle='--', color=color, label=label_rent)
+    legend_handles += [Line2D([], [], color=color, label=label_buy, **buy_style),
+                       Line2D([], [], color=color, label=label_rent, **rent_style)]
+
+point_colors = np.repeat(line_colors, [len(line) for line in buy_lines], axis=0)
+for lines, style in ((buy_lines, buy_style), (rent_lines, rent_style)):
+    ax.add_collection(LineCollection(lines, colors=line_colors, linestyles=style['linestyle']))
+    markers = np.concatenate(lines)
+    ax.scatter(markers[:, 0], markers[:, 1], c=point_colors, marker=style['marker'], zorder=2)
+ax.autoscale_view()
 
 ax.set_xlabel("Year")
 ax.set_ylabel("Wealth (RM)")
 ax.set_title(f"Wealth Accumulation Over Time | Appreciation {selected_app}%, Rent Yield {selected_ry}%")
-ax.legend(fontsize=8, loc='upper left', bbox_to_anchor=(1,1))
-plt.tight_layout()
-st.pyplot(fig)
+ax.legend(handles=legend_handles, fontsize=8, loc='upper left', bbox_to_anchor=(1,1))
+st.pyplot(fig, clear_figure=True)
+plt.close(fig)  # release the figure so long sessions don't accumulate pyplot state
 
 # --------------------------
 # Show Final Values Table
 # --------------------------
 st.subheader("📋 Final Wealth Values (Last Year)")
 
-final_df = df_plot[df_plot['Year']==df_plot['Year'].max()][
-    ['MortgageRate','InvestReturn','BuyEquity','RentPortfolio','Difference']
-].copy()
-
-# Format values for readability
-final_df['BuyEquity'] = final_df['BuyEquity'].map('{:,.0f}'.format)
-final_df['RentPortfolio'] = final_df['RentPortfolio'].map('{:,.0f}'.format)
-final_df['Difference'] = final_df['Difference'].map('{:,.0f}'.format)
+# Runs are year-sorted, so each scenario's last row is its final year
+run_ends = np.r_[starts[1:], len(df_plot)] - 1
+final_cols = df_plot.columns.get_indexer(['MortgageRate','InvestReturn','BuyEquity','RentPortfolio','Difference'])
+final_df = df_plot.iloc[run_ends, final_cols]
 
-st.dataframe(final_df.reset_index(drop=True))
+# Format values for readability at render time; the columns stay numeric
+st.dataframe(final_df.style.format(
+    {'BuyEquity': '{:,.0f}', 'RentPortfolio': '{:,.0f}', 'Difference': '{:,.0f}'}
+), hide_index=True)
 
 # --------------------------
 # Download Filtered Data
 # --------------------------
 st.subheader("⬇️ Download Filtered Multi-Scenario Data")
-csv_filtered = df_plot.to_csv(index=False).encode('utf-8')
+csv_filtered = to_csv_bytes(df_plot)
 st.download_button(
     "Download CSV",
     data=csv_filtered,